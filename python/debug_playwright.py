@@ -1,5 +1,29 @@
+import re
+
 from fb_ads_library_api import FbAdsLibraryTraversal
 
+# Same launch flags, blocked assets and XHR filter as the public fetch
+CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--blink-settings=imagesEnabled=false",
+]
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+RELEVANT_URL_RE = re.compile(r"/ads/library/(?:async/)?search_ads|/api/graphql")
+
+
+def is_relevant_response(response):
+    match = RELEVANT_URL_RE.search(response.url)
+    if match is None:
+        return False
+    if match.group(0) == "/api/graphql":
+        return "AdLibrary" in response.request.headers.get("x-fb-friendly-name", "")
+    return True
+
+
 api = FbAdsLibraryTraversal("medicure.tn", country="TN")
 public_url = api.get_public_search_url()
 print(f"Public URL: {public_url}\n")
@@ -11,23 +35,37 @@ except Exception as e:
     raise
 
 with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
+    browser = p.chromium.launch(headless=True, args=CHROMIUM_ARGS)
     context = browser.new_context(user_agent=api.headers.get("User-Agent"))
+    context.route(
+        "**/*",
+        lambda route: route.abort()
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES
+        else route.continue_(),
+    )
     page = context.new_page()
 
     responses = []
+    seen = set()
 
     def on_response(response):
         try:
+            # Same filter as the public fetch: only Ads Library XHRs, once each
+            if not is_relevant_response(response):
+                return
+            # GraphQL POSTs share their url
+            key = (response.url, response.request.post_data)
+            if key in seen:
+                return
+            seen.add(key)
             url = response.url
             status = response.status
             ct = response.headers.get('content-type', '')
             rtype = response.request.resource_type
             snippet = ''
             try:
-                if 'json' in ct.lower() or rtype in ('xhr', 'fetch'):
-                    text = response.text()
-                    snippet = text[:500].replace('\n', ' ')
+                text = response.text()
+                snippet = text[:500].replace('\n', ' ')
             except Exception:
                 pass
             print(f"RESP: status={status} type={rtype} ct={ct} url={url}")
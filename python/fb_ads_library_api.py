@@ -6,31 +6,378 @@
 # This source code is licensed under the license found in the
 # LICENSE file in the root directory of this source tree.
 
+import asyncio
+import atexit
+import contextlib
+import functools
 import json
+import queue
 import re
+import threading
 import time
+from datetime import datetime
+from urllib.parse import parse_qs, quote, urlparse
 
 import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+try:
+    # orjson decodes straight from bytes and is several times faster than the
+    # stdlib; its JSONDecodeError subclasses json.JSONDecodeError.
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# Facebook prefixes some JSON responses with this anti-hijacking guard
+_JSON_GUARD = b"for (;;);"
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+# Pages are streamed with ijson and handed out in chunks of this many ads;
+# bodies below _STREAM_MIN_BYTES are decoded in one go instead.
+_STREAM_CHUNK_SIZE = 64
+_STREAM_MIN_BYTES = 4096
+
+# Chromium takes seconds to start, so one headless browser is shared by
+# every traversal for the lifetime of the process. It is driven through the
+# async Playwright API on a dedicated event loop thread so several searches
+# can load concurrently, each in its own context.
+_CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--blink-settings=imagesEnabled=false",
+]
+# Only XHR JSON is consumed, so these are aborted before they are downloaded
+_BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+_BROWSER_LOOP = None
+_BROWSER_TASK = None
+_PLAYWRIGHT = None
+# Guards the lazy creation of the browser loop and its one-time shutdown
+_BROWSER_LOCK = threading.Lock()
+_BROWSER_CLOSED = False
+# Marks the end of the batches streamed from concurrent fetches
+_END_OF_BATCHES = object()
+# Public-page batches waiting for a slow consumer; capture pauses beyond this
+_MAX_QUEUED_BATCHES = 16
+
+# Only these XHRs carry ad data; tracking pixels, telemetry and polling are
+# skipped before their body is fetched over CDP.
+_RELEVANT_URL_RE = re.compile(r"/ads/library/(?:async/)?search_ads|/api/graphql")
+
+# Captured XHR bodies outside this size range are not ad JSON
+_MIN_AD_BODY_BYTES = 100
+_MAX_AD_BODY_BYTES = 20_000_000
+
+# Public pages are scrolled until a scroll brings no new ads for
+# _SCROLL_IDLE_SECONDS, at most _MAX_SCROLLS times
+_SCROLL_IDLE_SECONDS = 1.5
+_MAX_SCROLLS = 12
+
+# Installed in every public-page context so the DOM fallback is parsed once
+# per page and each call is a short evaluate("window.__collectAds()"). It
+# lists the Ads Library links with the page name found in their nearest
+# enclosing div; the name lookup is cached per div since many links share one.
+_DOM_FALLBACK_JS = r"""
+(() => {
+    window.__collectAds = () => {
+        const names = new Map();
+        const items = [];
+        for (const a of document.querySelectorAll('a[href*="/ads/library/"]')) {
+            try {
+                const href = a.href || '';
+                let pageName = (a.innerText || '').trim();
+                let parent = a.parentElement;
+                while (parent && parent.tagName !== 'DIV') {
+                    parent = parent.parentElement;
+                }
+                if (parent) {
+                    if (!names.has(parent)) {
+                        const nameEl = parent.querySelector('[data-testid], [aria-label], h3, span');
+                        names.set(parent, nameEl && nameEl.innerText ? nameEl.innerText.trim() : null);
+                    }
+                    pageName = names.get(parent) || pageName;
+                }
+                items.push({page_name: pageName, ad_snapshot_url: href});
+            } catch (e) {}
+        }
+        return items;
+    };
+})();
+"""
+
+# Tokens embedded in the public page's HTML, needed by the async endpoint
+_LSD_TOKEN_RE = re.compile(r'"LSD",\[\],\{"token":"([^"]+)"')
+_DTSG_TOKEN_RE = re.compile(r'"DTSGInitialData",\[\],\{"token":"([^"]+)"')
+
+_AD_ID_RE = re.compile(r"/\?id=([0-9]+)")
 
 
 def get_ad_archive_id(data):
     """
     Extract ad_archive_id from ad_snapshot_url
     """
-    return re.search(r"/\?id=([0-9]+)", data["ad_snapshot_url"]).group(1)
+    url = data["ad_snapshot_url"]
+    # Fast path: the id directly follows the first "/?id="
+    start = url.find("/?id=") + 5
+    if start >= 5:
+        end = start
+        while end < len(url) and "0" <= url[end] <= "9":
+            end += 1
+        if end > start:
+            return url[start:end]
+    return _AD_ID_RE.search(url).group(1)
+
+
+@functools.lru_cache(maxsize=None)
+def _date_cutoff(after_date):
+    """
+    Normalize after_date to the YYYY-MM-DD string ad start times are compared
+    against, or None if it is not a valid date
+    """
+    try:
+        return datetime.strptime(after_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        return None
 
 
-class FbAdsLibraryTraversal:
-    # The async endpoint sometimes returns empty pages; construct a public-facing
-    # search URL that includes the parameters known to return results in the
-    # Ads Library UI. We still keep an async URL pattern for bulk fetching.
-    default_url_pattern = (
-        "https://www.facebook.com/ads/library/async/search_ads/?q={q}&active_status=all&ad_type=all&country={country}&limit={limit}"
-    )
+def _ad_start_date(ad):
+    """
+    YYYY-MM-DD prefix of an ad's delivery start time; "1970-01-01" if it has
+    none, or "" if it is not a string
+    """
+    if not isinstance(ad, dict):
+        return ""
+    value = ad.get("ad_delivery_start_time", "1970-01-01")
+    return value[:10] if isinstance(value, str) else ""
+
+
+def _ad_id(ad):
+    """
+    Best-effort ad id of a captured record, or None if it has none
+    """
+    if not isinstance(ad, dict):
+        return None
+    try:
+        return get_ad_archive_id(ad)
+    except (KeyError, AttributeError, TypeError):
+        return ad.get("ad_archive_id") or ad.get("id")
+
+
+def _drop_seen_ads(ad_archives, seen_ids):
+    """
+    Filter out ads whose id is already in seen_ids, recording the new ones;
+    records without an id are always kept
+    """
+    kept = []
+    for ad in ad_archives:
+        ad_id = _ad_id(ad)
+        if ad_id is not None:
+            if ad_id in seen_ids:
+                continue
+            seen_ids.add(ad_id)
+        kept.append(ad)
+    return kept
+
+
+def _strip_json_guard(body):
+    """
+    Drop a leading UTF-8 BOM and Facebook's for (;;); guard from a JSON body
+    """
+    if body[:3] == _UTF8_BOM:
+        body = body[3:]
+    if body[:9] == _JSON_GUARD:
+        body = body[9:]
+    return body
+
+
+def _decode_json_body(body):
+    """
+    Decode a JSON body straight from bytes. Working on bytes skips the
+    response.encoding sniffing and str copy that response.text implies.
+    """
+    return _json_loads(_strip_json_guard(body))
+
+
+class _PrefixedReader:
+    """
+    File-like object replaying already-read bytes before the rest of a stream
+    """
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        # ijson probes the stream type with read(0)
+        if self.prefix and size != 0:
+            data, self.prefix = self.prefix, b""
+            return data
+        return self.stream.read(size)
+
+
+def _chunk_ad_archives(events, chunk_size):
+    """
+    Rebuild the `data` items from ijson parse events and yield them in lists
+    of chunk_size; returns the `paging.next` url, or None if `data` was empty
+    """
+    from ijson.common import ObjectBuilder
+
+    builder = None
+    ad_archives = []
+    found = False
+    next_page_url = None
+    for prefix, event, value in events:
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "data.item" and event in ("end_map", "end_array"):
+                ad_archives.append(builder.value)
+                builder = None
+        elif prefix == "data.item":
+            if event in ("start_map", "start_array"):
+                builder = ObjectBuilder()
+                builder.event(event, value)
+            else:
+                ad_archives.append(value)
+        elif prefix == "paging.next" and event == "string":
+            next_page_url = value
+
+        if len(ad_archives) >= chunk_size:
+            found = True
+            yield ad_archives
+            ad_archives = []
+
+    if ad_archives:
+        found = True
+        yield ad_archives
+    return next_page_url if found else None
+
+
+def _is_relevant_response(response):
+    """
+    Whether a Playwright response may contain Ads Library results
+    """
+    match = _RELEVANT_URL_RE.search(response.url)
+    if match is None:
+        return False
+    if match.group(0) == "/api/graphql":
+        # GraphQL shares one endpoint; the query name tells ads apart
+        return "AdLibrary" in response.request.headers.get("x-fb-friendly-name", "")
+    return True
+
+
+async def _route_without_assets(route):
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def _response_key(response):
+    """
+    Identify a response for deduplication; GraphQL POSTs share their url
+    """
+    return (response.url, response.request.post_data)
+
+
+async def _aput_batch(batches, batch, stopped):
+    """
+    Put a batch on a bounded queue.Queue from the browser loop without
+    blocking it; gives up once the consumer has stopped reading
+    """
+    while not stopped.is_set():
+        try:
+            batches.put_nowait(batch)
+            return
+        except queue.Full:
+            await asyncio.sleep(0.05)
+
+
+def _get_browser_loop():
+    global _BROWSER_LOOP
+    # Bootstrapped traversals reach this from several merge worker threads
+    with _BROWSER_LOCK:
+        if _BROWSER_LOOP is None:
+            _BROWSER_LOOP = asyncio.new_event_loop()
+            threading.Thread(
+                target=_BROWSER_LOOP.run_forever, name="playwright-loop", daemon=True
+            ).start()
+            atexit.register(_close_browser)
+        return _BROWSER_LOOP
+
+
+def _run_on_browser_loop(coroutine):
+    """
+    Schedule a coroutine on the browser loop; returns a concurrent Future
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_browser_loop())
+
+
+async def _alaunch_browser():
+    global _PLAYWRIGHT
+    try:
+        from playwright.async_api import async_playwright
+    except Exception:
+        raise RuntimeError(
+            "Playwright is required for public-page fetching. Install with: pip install playwright && playwright install"
+        )
+    _PLAYWRIGHT = await async_playwright().start()
+    return await _PLAYWRIGHT.chromium.launch(headless=True, args=_CHROMIUM_ARGS)
+
+
+async def _aget_browser():
+    # Runs on the browser loop only, so creating the task cannot race
+    global _BROWSER_TASK
+    if _BROWSER_TASK is None:
+        _BROWSER_TASK = asyncio.ensure_future(_alaunch_browser())
+    return await _BROWSER_TASK
+
+
+async def _aclose_browser():
+    if _BROWSER_TASK is not None and _BROWSER_TASK.done() and not _BROWSER_TASK.exception():
+        await _BROWSER_TASK.result().close()
+    if _PLAYWRIGHT is not None:
+        await _PLAYWRIGHT.stop()
+
+
+def _close_browser():
+    global _BROWSER_CLOSED
+    with _BROWSER_LOCK:
+        if _BROWSER_LOOP is None or _BROWSER_CLOSED:
+            return
+        _BROWSER_CLOSED = True
+    try:
+        _run_on_browser_loop(_aclose_browser()).result(timeout=10)
+    except Exception:
+        pass
+    _BROWSER_LOOP.call_soon_threadsafe(_BROWSER_LOOP.stop)
+
+
+def _iterate_async_generator(async_generator):
+    """
+    Drive an async generator from synchronous code on a private event loop
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(async_generator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(async_generator.aclose())
+        loop.close()
 
-    public_url_pattern = (
-        "https://www.facebook.com/ads/library/?active_status=active&ad_type=all&country={country}&is_targeted_country=false&media_type=all&q={q}&search_type=keyword_unordered"
-    )
+
+class FbAdsLibraryTraversal:
+    # The async endpoint sometimes returns empty pages; get_public_search_url
+    # builds a public-facing search URL with the parameters known to return
+    # results in the Ads Library UI, while _get_async_search_url is used for
+    # bulk fetching.
 
     def __init__(
         self,
@@ -38,6 +385,7 @@ class FbAdsLibraryTraversal:
         country="TN",
         page_limit=500,
         retry_limit=3,
+        session=None,
     ):
         self.search_term = search_term
         self.country = country
@@ -48,23 +396,190 @@ class FbAdsLibraryTraversal:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "application/json, text/javascript, */*; q=0.01",
         }
-
-    def generate_ad_archives(self):
-        # Start from the async URL (bulk) with named params
-        next_page_url = self.default_url_pattern.format(
-            q=self.search_term,
-            country=self.country,
-            limit=self.page_limit,
+        # Every page request sends the same headers; build them once, with
+        # the Referer set to the public page to mimic browser navigation
+        self._referer = self.get_public_search_url()
+        self._req_headers = {**self.headers, "Referer": self._referer}
+        # Keep one pooled session so pagination reuses the same keep-alive
+        # connection instead of paying a TCP+TLS handshake per page.
+        self._owns_session = session is None
+        self.session = session if session is not None else self.create_session()
+        self.session.headers.update(self.headers)
+        # Cookies and lsd/fb_dtsg tokens from _bootstrap_tokens, and whether
+        # the async endpoint answered 401/403
+        self._tokens = None
+        self._blocked = False
+
+    @staticmethod
+    def create_session(pool_connections=4, pool_maxsize=16):
+        """Return a requests.Session with a pooled HTTPS adapter.
+
+        Retries are handled by _get_ad_archives_from_url, so the adapter
+        itself never retries.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0
         )
+        session.mount("https://", adapter)
+        return session
+
+    @staticmethod
+    def create_async_client(max_keepalive_connections=8, max_connections=16):
+        """Return an HTTP/2 httpx.AsyncClient (requires `httpx[http2]`).
+
+        Concurrent requests made through it are multiplexed as streams over
+        a shared connection instead of each opening their own.
+        """
+        try:
+            import httpx
+
+            return httpx.AsyncClient(
+                http2=True,
+                timeout=10,
+                limits=httpx.Limits(
+                    max_keepalive_connections=max_keepalive_connections,
+                    max_connections=max_connections,
+                ),
+            )
+        except ImportError:
+            raise RuntimeError(
+                "httpx is required for prefetching. Install with: pip install 'httpx[http2]'"
+            )
+
+    def close(self):
+        """Release the pooled connections (only if the session is ours)."""
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def generate_ad_archives(self, prefetch=False):
+        """Yield lists of ad_archives from the async endpoint.
+
+        With prefetch=True the next page is requested while the current one
+        is being consumed (requires `httpx`).
+        """
+        next_page_url = self._get_async_search_url()
+        if prefetch:
+            return _iterate_async_generator(self._aget_ad_archives_from_url(next_page_url))
         return self._get_ad_archives_from_url(next_page_url)
 
+    @classmethod
+    def generate_ad_archives_multiplexed(cls, traversals):
+        """Page through the async endpoint for several traversals at once,
+        with next-page prefetch, over one shared HTTP/2 client (requires
+        `httpx`). Lists of ad_archives are yielded as they arrive.
+        """
+        async def drain_all(batches):
+            async with cls.create_async_client() as client:
+                async def drain(traversal):
+                    pages = traversal._aget_ad_archives_from_url(traversal._get_async_search_url(), client)
+                    try:
+                        async for ad_archives in pages:
+                            await batches.put(ad_archives)
+                    finally:
+                        await pages.aclose()
+
+                try:
+                    await asyncio.gather(*(drain(traversal) for traversal in traversals))
+                finally:
+                    await batches.put(_END_OF_BATCHES)
+
+        async def merged():
+            batches = asyncio.Queue()
+            task = asyncio.ensure_future(drain_all(batches))
+            try:
+                while True:
+                    ad_archives = await batches.get()
+                    if ad_archives is _END_OF_BATCHES:
+                        break
+                    yield ad_archives
+                # Re-raise errors from the fetches, e.g. missing httpx
+                await task
+            finally:
+                if not task.done():
+                    task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await task
+
+        return _iterate_async_generator(merged())
+
+    def generate_ad_archives_from_bootstrapped_session(self, max_wait=20):
+        """Load the public page once in the headless browser to obtain the
+        session cookies and lsd token, then page through the async endpoint
+        over plain HTTP with them (fb_dtsg is cached but not sent).
+
+        This requires `playwright` to be installed. If the endpoint still
+        answers 401/403, it falls back to generate_ad_archives_from_public_page.
+        """
+        # The cookies and x-fb-lsd header are sent by _fetch_page; tokens are
+        # kept out of the url so they never end up in logged urls
+        self._bootstrap_tokens(max_wait)
+
+        found = False
+        for ad_archives in self._get_ad_archives_from_url(self._get_async_search_url()):
+            found = True
+            yield ad_archives
+        if not found and self._blocked:
+            print("Async endpoint still blocked; falling back to the public page")
+            yield from self.generate_ad_archives_from_public_page(max_wait=max_wait)
+
+    def _get_async_search_url(self):
+        # Start from the async URL (bulk); the search term is URL-encoded
+        return (
+            "https://www.facebook.com/ads/library/async/search_ads/"
+            f"?q={quote(self.search_term)}&active_status=all&ad_type=all"
+            f"&country={self.country}&limit={self.page_limit}"
+        )
+
+    def _bootstrap_tokens(self, max_wait=20):
+        """Return the cookies and tokens of one public page load, cached on
+        the traversal so the browser is only needed once.
+        """
+        if self._tokens is None:
+            self._tokens = _run_on_browser_loop(self._abootstrap_tokens(max_wait)).result()
+            if "lsd" in self._tokens:
+                self._req_headers = {**self._req_headers, "x-fb-lsd": self._tokens["lsd"]}
+        return self._tokens
+
+    async def _abootstrap_tokens(self, max_wait):
+        browser = await _aget_browser()
+        context = await browser.new_context(user_agent=self.headers.get("User-Agent"))
+        try:
+            await context.route("**/*", _route_without_assets)
+            page = await context.new_page()
+            await page.goto(self.get_public_search_url(), timeout=max_wait * 1000)
+            html = await page.content()
+            cookies = await context.cookies("https://www.facebook.com")
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+        tokens = {"cookies": {cookie["name"]: cookie["value"] for cookie in cookies}}
+        for name, token_re in (("lsd", _LSD_TOKEN_RE), ("fb_dtsg", _DTSG_TOKEN_RE)):
+            match = token_re.search(html)
+            if match:
+                tokens[name] = match.group(1)
+        return tokens
+
     def get_public_search_url(self):
         """Return the Ads Library public search URL (openable in a browser).
 
         This uses 'active_status=active' and 'search_type=keyword_unordered' so
         it matches the non-empty UI search the user expects.
         """
-        return self.public_url_pattern.format(country=self.country, q=self.search_term)
+        return (
+            "https://www.facebook.com/ads/library/?active_status=active&ad_type=all"
+            f"&country={self.country}&is_targeted_country=false&media_type=all"
+            f"&q={quote(self.search_term)}&search_type=keyword_unordered"
+        )
 
     def generate_ad_archives_from_public_page(self, max_wait=20):
         """Use a headless browser (Playwright) to load the public Ads Library page
@@ -73,181 +588,374 @@ class FbAdsLibraryTraversal:
         This requires `playwright` to be installed. It yields lists of ad_archives
         similar to the async endpoint.
         """
+        return self.generate_ad_archives_from_public_pages([self], max_wait=max_wait)
+
+    @classmethod
+    def generate_ad_archives_from_public_pages(cls, traversals, max_wait=20):
+        """Load the public page of several traversals concurrently, one
+        browser context each, and yield lists of ad_archives as soon as they
+        are captured.
+        """
+        batches = queue.Queue(maxsize=_MAX_QUEUED_BATCHES)
+        stopped = threading.Event()
+
+        async def load_all():
+            try:
+                await asyncio.gather(
+                    *(traversal._aload_public_page(batches, stopped, max_wait) for traversal in traversals)
+                )
+            finally:
+                await _aput_batch(batches, _END_OF_BATCHES, stopped)
+
+        future = _run_on_browser_loop(load_all())
         try:
-            from playwright.sync_api import sync_playwright
-        except Exception as e:
-            raise RuntimeError(
-                "Playwright is required for public-page fetching. Install with: pip install playwright && playwright install"
-            )
+            while True:
+                batch = batches.get()
+                if batch is _END_OF_BATCHES:
+                    break
+                yield batch
+            # Re-raise errors from the browser loop, e.g. missing Playwright
+            future.result()
+        finally:
+            stopped.set()
+            future.cancel()
+
+    async def _aload_public_page(self, batches, stopped, max_wait=20):
+        """Load this traversal's public page in a fresh context of the shared
+        browser, putting captured lists of ad_archives on the bounded batches
+        queue while the page is still being scrolled. Puts wait while the
+        queue is full and are dropped once `stopped` is set.
+        """
+        browser = await _aget_browser()
 
         public_url = self.get_public_search_url()
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(user_agent=self.headers.get("User-Agent"))
-            page = context.new_page()
+        # A fresh context per search keeps cookies/cache isolated while the
+        # browser itself is reused.
+        context = await browser.new_context(user_agent=self.headers.get("User-Agent"))
+        # Response handler tasks; all of them finish before this load returns
+        # so the end-of-batches marker is queued after every captured batch
+        pending = set()
+        try:
+            await context.route("**/*", _route_without_assets)
+            await context.add_init_script(_DOM_FALLBACK_JS)
+            page = await context.new_page()
 
-            collected = []
+            captured = False
+            seen_responses = set()
+            seen_ids = set()
+            data_arrived = asyncio.Event()
 
-            def handle_response(response):
+            async def handle_response(response):
                 try:
-                    ct = response.headers.get("content-type", "") or ""
-                    is_json_ct = "json" in ct.lower()
-                    is_xhr = response.request.resource_type in ("xhr", "fetch")
-                    if is_json_ct or is_xhr:
-                        try:
-                            text = response.text()
-                            data = json.loads(text)
-                            # Accept dicts that contain 'data' or lists of items
-                            if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
-                                collected.append(data["data"])
-                            elif isinstance(data, list) and len(data) > 0:
-                                collected.append(data)
-                        except Exception:
-                            pass
+                    if not _is_relevant_response(response):
+                        return
+                    key = _response_key(response)
+                    if key in seen_responses:
+                        return
+                    seen_responses.add(key)
+
+                    # Skip bodies too small to hold an ad (e.g. {"data":[]}) or
+                    # too large to be ad JSON; check the declared length first
+                    # to avoid transferring them over CDP at all
+                    content_length = response.headers.get("content-length")
+                    if content_length is not None and int(content_length) > _MAX_AD_BODY_BYTES:
+                        return
+                    body = await response.body()
+                    if not _MIN_AD_BODY_BYTES <= len(body) <= _MAX_AD_BODY_BYTES:
+                        return
+                    data = _decode_json_body(body)
+                    # Accept dicts that contain 'data' or lists of items
+                    if isinstance(data, dict) and "data" in data and isinstance(data["data"], list):
+                        batch = data["data"]
+                    elif isinstance(data, list) and len(data) > 0:
+                        batch = data
+                    else:
+                        return
+                    # Scroll XHRs overlap with the initial render; only hand
+                    # each ad downstream once
+                    batch = _drop_seen_ads(batch, seen_ids)
+                    if batch:
+                        nonlocal captured
+                        captured = True
+                        data_arrived.set()
+                        await _aput_batch(batches, batch, stopped)
                 except Exception:
                     pass
 
-            page.on("response", handle_response)
-            page.goto(public_url, timeout=max_wait * 1000)
+            def on_response(response):
+                task = asyncio.ensure_future(handle_response(response))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            page.on("response", on_response)
+            await page.goto(public_url, timeout=max_wait * 1000)
 
             # Wait for network to be mostly idle
             try:
-                page.wait_for_load_state("networkidle", timeout=max_wait * 1000)
+                await page.wait_for_load_state("networkidle", timeout=max_wait * 1000)
             except Exception:
                 # networkidle may time out; continue anyway
                 pass
 
-            # Scroll a few times to trigger lazy loads / further XHRs
-            for _ in range(6):
+            # Scroll to trigger lazy loads / further XHRs, and stop as soon as
+            # a scroll brings no new ads within the idle window
+            for _ in range(_MAX_SCROLLS):
+                data_arrived.clear()
                 try:
-                    page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
+                    await page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
                 except Exception:
                     pass
-                page.wait_for_timeout(1000)
-
-            # Small extra wait for remaining requests
-            page.wait_for_timeout(2000)
-
-            # Yield collected batches
-            for batch in collected:
-                yield batch
+                try:
+                    await asyncio.wait_for(data_arrived.wait(), _SCROLL_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+            else:
+                # Scroll cap reached; small extra wait for remaining requests
+                await asyncio.sleep(_SCROLL_IDLE_SECONDS)
 
             # If we didn't capture JSON XHRs, attempt a DOM-based fallback to
             # extract ad snapshot links and nearby page names from the rendered
             # HTML. This is a best-effort approach and may need tuning.
-            if len(collected) == 0:
+            if not captured:
                 try:
-                    dom_items = page.evaluate("""() => {
-                        const anchors = Array.from(document.querySelectorAll('a[href*="/ads/library/"]'));
-                        const items = [];
-                        anchors.forEach(a => {
-                            try {
-                                const href = a.href || '';
-                                const text = (a.innerText || '').trim();
-                                let pageName = text;
-                                const parent = a.closest('div');
-                                if (parent) {
-                                    const nameEl = parent.querySelector('[data-testid], [aria-label], h3, span');
-                                    if (nameEl && nameEl.innerText) {
-                                        pageName = nameEl.innerText.trim();
-                                    }
-                                }
-                                items.push({page_name: pageName, ad_snapshot_url: href});
-                            } catch (e) {}
-                        });
-                        return items;
-                    }""")
+                    dom_items = await page.evaluate("window.__collectAds()")
                     if dom_items and isinstance(dom_items, list) and len(dom_items) > 0:
-                        yield dom_items
+                        dom_items = _drop_seen_ads(dom_items, seen_ids)
+                        await _aput_batch(batches, dom_items, stopped)
                 except Exception:
                     pass
 
+            # Handlers may still be waiting for room on the queue
+            while pending:
+                await asyncio.gather(*pending)
+        finally:
+            for task in list(pending):
+                task.cancel()
             try:
-                browser.close()
+                await context.close()
             except Exception:
                 pass
 
     def _get_ad_archives_from_url(self, next_page_url):
-        timeout = 10
         while next_page_url is not None:
-            attempt = 0
-            response = None
-            while attempt < self.retry_limit:
-                attempt += 1
-                try:
-                    # set Referer to the public page to mimic browser navigation
-                    headers = dict(self.headers)
-                    try:
-                        headers["Referer"] = self.public_url_pattern.format(country=self.country, q=self.search_term)
-                    except Exception:
-                        pass
-                    response = requests.get(next_page_url, headers=headers, timeout=timeout)
-                except requests.RequestException as e:
-                    print(f"Request error (attempt {attempt}) for {next_page_url}: {e}")
+            # Ads of this page already yielded; a retry after a read error
+            # skips them so nothing is handed out twice
+            yielded = 0
+            for attempt in range(1, self.retry_limit + 1):
+                response = self._fetch_page(next_page_url, attempt)
+                if response is None:
+                    if self._blocked:
+                        return
                     if attempt < self.retry_limit:
                         time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        break
-
-                if response is None:
+                    continue
+                # The body is read lazily from urllib3, so a connection dropped
+                # mid-body raises here rather than inside _fetch_page
+                page = self._stream_page(response, next_page_url)
+                skip = yielded
+                try:
+                    while True:
+                        ad_archives = next(page)
+                        if skip:
+                            skipped = len(ad_archives[:skip])
+                            ad_archives = ad_archives[skip:]
+                            skip -= skipped
+                            if not ad_archives:
+                                continue
+                        yielded += len(ad_archives)
+                        yield ad_archives
+                except StopIteration as stop:
+                    next_page_url = stop.value
                     break
-
-                if response.status_code != 200:
-                    print(f"HTTP error {response.status_code} for URL {next_page_url} (attempt {attempt})")
+                except urllib3.exceptions.HTTPError as e:
+                    print(f"Read error (attempt {attempt}) for {next_page_url}: {e}")
                     if attempt < self.retry_limit:
                         time.sleep(2 ** attempt)
-                        continue
-                    else:
-                        break
+                finally:
+                    page.close()
+            else:
+                return
 
-                # Got a 200, try to decode JSON
+    def _fetch_page(self, url, attempt=1):
+        """GET one page of the async endpoint.
+
+        The body is left unread (stream=True) so it can be parsed
+        incrementally; returns None if the request failed, the caller
+        owning the retries. A 401/403 also sets self._blocked.
+        """
+        timeout = 10
+        cookies = self._tokens["cookies"] if self._tokens is not None else None
+        try:
+            response = self.session.get(
+                url, headers=self._req_headers, cookies=cookies, timeout=timeout, stream=True
+            )
+        except requests.RequestException as e:
+            print(f"Request error (attempt {attempt}) for {url}: {e}")
+            return None
+
+        if response.status_code in (401, 403):
+            # Blocked by the anti-bot check; retrying will not help
+            print(f"HTTP error {response.status_code} for URL {url} (blocked)")
+            response.close()
+            self._blocked = True
+            return None
+
+        if response.status_code != 200:
+            print(f"HTTP error {response.status_code} for URL {url} (attempt {attempt})")
+            response.close()
+            return None
+
+        return response
+
+    def _stream_page(self, response, url):
+        """Yield the ads of one page and return its paging.next url.
+
+        Large bodies are parsed with `ijson` (when installed) so the first ads
+        are yielded while the rest of the page is still being read; small
+        bodies are cheaper to decode in one go.
+        """
+        try:
+            import ijson
+        except ImportError:
+            ijson = None
+
+        with response:
+            # Read the urllib3 stream directly (decompressed) rather than
+            # response.content/.text, so the body is never copied into a str
+            response.raw.decode_content = True
+            content_length = response.headers.get("Content-Length")
+            is_small = content_length is not None and int(content_length) < _STREAM_MIN_BYTES
+            if ijson is None or is_small:
+                body = response.raw.read()
                 try:
-                    response_data = json.loads(response.text)
+                    response_data = _decode_json_body(body)
                 except json.JSONDecodeError:
                     # If the response is HTML, likely the async endpoint blocked or returned UI
-                    text_snippet = response.text[:200].replace('\n', ' ')
-                    print(f"Failed to decode JSON from {next_page_url}. Response snippet: {text_snippet}")
-                    # Don't retry endlessly on invalid content; break out
-                    response_data = None
-                    break
+                    text_snippet = body[:200].decode("utf-8", "replace").replace('\n', ' ')
+                    print(f"Failed to decode JSON from {url}. Response snippet: {text_snippet}")
+                    return None
 
                 # Vérifie si des données sont présentes
                 if not response_data or "data" not in response_data or len(response_data["data"]) == 0:
-                    # No data — stop iteration
-                    break
+                    return None
 
                 yield response_data["data"]
 
                 # Pagination (si disponible)
+                return response_data.get("paging", {}).get("next")
+
+            # Peek at the start of the body to drop the guard before ijson
+            # sees it, then replay the remainder in front of the stream
+            head = b""
+            while len(head) < len(_UTF8_BOM) + len(_JSON_GUARD):
+                chunk = response.raw.read(len(_UTF8_BOM) + len(_JSON_GUARD) - len(head))
+                if not chunk:
+                    break
+                head += chunk
+            stream = _PrefixedReader(_strip_json_guard(head), response.raw)
+            events = ijson.parse(stream, use_float=True)
+            try:
+                return (yield from _chunk_ad_archives(events, _STREAM_CHUNK_SIZE))
+            except ijson.JSONError as e:
+                # If the response is HTML, likely the async endpoint blocked or returned UI
+                print(f"Failed to decode JSON from {url}: {e}")
+                return None
+
+    async def _afetch_page(self, client, url):
+        """Fetch one page of the async endpoint and return its decoded JSON,
+        or None once retries are exhausted or the body is not JSON.
+        """
+        import httpx
+
+        for attempt in range(1, self.retry_limit + 1):
+            try:
+                response = await client.get(url, headers=self._req_headers)
+            except httpx.HTTPError as e:
+                print(f"Request error (attempt {attempt}) for {url}: {e}")
+                if attempt < self.retry_limit:
+                    await asyncio.sleep(2 ** attempt)
+                continue
+
+            if response.status_code != 200:
+                print(f"HTTP error {response.status_code} for URL {url} (attempt {attempt})")
+                if attempt < self.retry_limit:
+                    await asyncio.sleep(2 ** attempt)
+                continue
+
+            try:
+                return _decode_json_body(response.content)
+            except json.JSONDecodeError:
+                text_snippet = response.content[:200].decode("utf-8", "replace").replace('\n', ' ')
+                print(f"Failed to decode JSON from {url}. Response snippet: {text_snippet}")
+                return None
+        return None
+
+    async def _aget_ad_archives_from_url(self, next_page_url, client=None):
+        """Async counterpart of _get_ad_archives_from_url that keeps one
+        request in flight: page N+1 is fetched while page N is consumed.
+
+        Pass a client from create_async_client to share its HTTP/2
+        connection with other traversals; otherwise one is opened here.
+        """
+        if client is None:
+            async with self.create_async_client() as client:
+                pages = self._aget_ad_archives_from_url(next_page_url, client)
+                try:
+                    async for ad_archives in pages:
+                        yield ad_archives
+                finally:
+                    await pages.aclose()
+            return
+
+        next_task = asyncio.ensure_future(self._afetch_page(client, next_page_url))
+        try:
+            while next_task is not None:
+                response_data = await next_task
+                next_task = None
+                if not response_data or "data" not in response_data or len(response_data["data"]) == 0:
+                    break
+
+                # Kick off the next page before handing this one over
                 next_page_url = response_data.get("paging", {}).get("next")
+                if next_page_url:
+                    next_task = asyncio.ensure_future(self._afetch_page(client, next_page_url))
+
+                yield response_data["data"]
+        finally:
+            if next_task is not None:
+                next_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await next_task
 
     @classmethod
-    def generate_ad_archives_from_url(cls, failure_url, after_date="1970-01-01"):
+    def generate_ad_archives_from_url(cls, failure_url, after_date="1970-01-01", session=None):
         """
         if we failed from error, later we can just continue from the last failure url
         """
+        # Rebuild a traversal from the query string of the failure url so the
+        # Referer and the pooled session match the original search. Pass a
+        # session to share its connection pool with other traversals.
+        query = parse_qs(urlparse(failure_url).query)
+        traversal = cls(
+            query.get("q", ["."])[0],
+            country=query.get("country", ["TN"])[0],
+            session=session,
+        )
         # _get_ad_archives_from_url only accepts the next_page_url parameter.
         # We yield results from that URL and, if after_date is provided,
         # filter out ad_archives that started before after_date.
-        for ad_archives in cls._get_ad_archives_from_url(failure_url):
-            if after_date:
-                try:
-                    from datetime import datetime
-
-                    cutoff = datetime.strptime(after_date, "%Y-%m-%d")
-                    def keep(ad):
-                        try:
-                            ad_date = datetime.strptime(ad.get("ad_delivery_start_time", "1970-01-01"), "%Y-%m-%d")
-                            return ad_date >= cutoff
-                        except Exception:
-                            return False
-
-                    filtered = list(filter(keep, ad_archives))
-                except Exception:
-                    # If date parsing fails, just yield original batch
-                    filtered = ad_archives
-                if filtered:
-                    yield filtered
-            else:
-                yield ad_archives
+        # Only strings can be hashed into the cutoff cache or parsed
+        cutoff = _date_cutoff(after_date) if isinstance(after_date, str) and after_date else None
+        with traversal:
+            for ad_archives in traversal._get_ad_archives_from_url(failure_url):
+                if after_date:
+                    if cutoff is None:
+                        # If date parsing fails, just yield original batch
+                        filtered = ad_archives
+                    else:
+                        # ISO-8601 dates compare correctly as strings
+                        filtered = [ad for ad in ad_archives if _ad_start_date(ad) >= cutoff]
+                    if filtered:
+                        yield filtered
+                else:
+                    yield ad_archives
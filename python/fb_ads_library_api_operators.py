@@ -69,32 +69,33 @@ def save_to_csv(generator_ad_archives, args, fields, is_verbose=False):
 
     delimiter = ","
     total_count = 0
-    output = fields + "\n"
+    field_list = fields.split(delimiter)
     output_file = args[0]
 
-    for ad_archives in generator_ad_archives:
-        total_count += len(ad_archives)
-        if is_verbose:
-            print("Items processed: %d" % total_count)
-        for ad_archive in ad_archives:
-            for field in list(fields.split(delimiter)):
-                if field in ad_archive:
-                    value = ad_archive[field]
-                    if (type(value) == list and type(value[0]) == dict) or type(
-                        value
-                    ) == dict:
-                        value = json.dumps(value)
-                    elif type(value) == list:
-                        value = delimiter.join(value)
-                    output += (
-                        '"' + value.replace("\n", "").replace('"', "") + '"' + delimiter
-                    )
-                else:
-                    output += delimiter
-            output = output.rstrip(",") + "\n"
-
+    # Rows are written batch by batch instead of growing one big string
     with open(output_file, "w") as csvfile:
-        csvfile.write(output)
+        csvfile.write(fields + "\n")
+        for ad_archives in generator_ad_archives:
+            total_count += len(ad_archives)
+            if is_verbose:
+                print("Items processed: %d" % total_count)
+            rows = []
+            for ad_archive in ad_archives:
+                row = []
+                for field in field_list:
+                    if field in ad_archive:
+                        value = ad_archive[field]
+                        if (type(value) == list and type(value[0]) == dict) or type(
+                            value
+                        ) == dict:
+                            value = json.dumps(value)
+                        elif type(value) == list:
+                            value = delimiter.join(value)
+                        row.append('"' + value.replace("\n", "").replace('"', "") + '"')
+                    else:
+                        row.append("")
+                rows.append(delimiter.join(row).rstrip(",") + "\n")
+            csvfile.writelines(rows)
 
     print("Successfully wrote data to file: %s" % output_file)
 
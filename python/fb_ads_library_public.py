@@ -6,7 +6,10 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import queue
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from fb_ads_library_api import FbAdsLibraryTraversal
 from fb_ads_library_api_operators import get_operators, save_to_csv
@@ -62,11 +65,21 @@ def get_parser():
         help="Open the Ads Library public search URL in the default browser",
         action="store_true",
     )
+    parser.add_argument(
+        "--prefetch",
+        help="Fetch the next page while the current one is processed, with all countries sharing one HTTP/2 connection (requires httpx)",
+        action="store_true",
+    )
     parser.add_argument(
         "--use-public-fetch",
         help="Use a headless browser to fetch Ads Library data from the public page (requires Playwright)",
         action="store_true",
     )
+    parser.add_argument(
+        "--use-bootstrap-fetch",
+        help="Get session cookies from one headless page load, then fetch Ads Library data over plain HTTP (requires Playwright)",
+        action="store_true",
+    )
     return parser
 
 
@@ -108,6 +121,43 @@ def validate_fields_param(fields_input):
         )
 
 
+def merge_ad_archives(generators, max_workers=8):
+    """
+    Drain several ad_archives generators on a thread pool and yield their
+    batches as they arrive
+    """
+    batches = queue.Queue()
+    done = object()
+    # Set when the consumer stops early so workers quit after their current page
+    stop = threading.Event()
+
+    def drain(generator):
+        try:
+            for ad_archives in generator:
+                batches.put(ad_archives)
+                if stop.is_set():
+                    break
+        finally:
+            generator.close()
+            batches.put(done)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(generators))) as executor:
+        futures = [executor.submit(drain, generator) for generator in generators]
+        remaining = len(futures)
+        try:
+            while remaining:
+                ad_archives = batches.get()
+                if ad_archives is done:
+                    remaining -= 1
+                else:
+                    yield ad_archives
+        finally:
+            stop.set()
+        # Re-raise any error from the workers
+        for future in futures:
+            future.result()
+
+
 def main():
     parser = get_parser()
     opts = parser.parse_args()
@@ -120,21 +170,26 @@ def main():
         search_term = "."
     else:
         search_term = opts.search_term
-    api = FbAdsLibraryTraversal(
-         search_term, opts.country
-    )
+    # Each country is an independent search; they share one pooled session
+    countries = [country.strip() for country in opts.country.split(",") if country.strip()]
+    session = FbAdsLibraryTraversal.create_session(pool_maxsize=len(countries) * 2)
+    apis = [
+        FbAdsLibraryTraversal(search_term, country, session=session)
+        for country in countries
+    ]
     # If user only wants the public URL, print/open and exit before fetching
     if getattr(opts, "print_public_url", False) or getattr(opts, "open_public_url", False):
-        public_url = api.get_public_search_url()
-        if getattr(opts, "print_public_url", False):
-            print(public_url)
-        if getattr(opts, "open_public_url", False):
-            try:
-                import webbrowser
-
-                webbrowser.open(public_url)
-            except Exception as e:
-                print(f"Failed to open browser: {e}")
+        for api in apis:
+            public_url = api.get_public_search_url()
+            if getattr(opts, "print_public_url", False):
+                print(public_url)
+            if getattr(opts, "open_public_url", False):
+                try:
+                    import webbrowser
+
+                    webbrowser.open(public_url)
+                except Exception as e:
+                    print(f"Failed to open browser: {e}")
         sys.exit(0)
     # For other operations, an action is required
     if not opts.action:
@@ -142,15 +197,32 @@ def main():
         parser.print_help()
         sys.exit(1)
 
+    # The prefetching HTTP/2 path never sends the bootstrap cookies or lsd token
+    if getattr(opts, "prefetch", False) and getattr(opts, "use_bootstrap_fetch", False):
+        print("--prefetch cannot be combined with --use-bootstrap-fetch")
+        sys.exit(1)
+
     # Choose fetch method: async endpoint (default) or public-page headless fetch
     if getattr(opts, "use_public_fetch", False):
         try:
-            generator_ad_archives = api.generate_ad_archives_from_public_page()
+            generator_ad_archives = FbAdsLibraryTraversal.generate_ad_archives_from_public_pages(apis)
         except RuntimeError as e:
             print(e)
             sys.exit(1)
+    elif getattr(opts, "prefetch", False):
+        # All countries share one HTTP/2 connection
+        generator_ad_archives = FbAdsLibraryTraversal.generate_ad_archives_multiplexed(apis)
     else:
-        generator_ad_archives = api.generate_ad_archives()
+        if getattr(opts, "use_bootstrap_fetch", False):
+            generators = [
+                api.generate_ad_archives_from_bootstrapped_session() for api in apis
+            ]
+        else:
+            generators = [api.generate_ad_archives() for api in apis]
+        if len(generators) == 1:
+            generator_ad_archives = generators[0]
+        else:
+            generator_ad_archives = merge_ad_archives(generators)
     if opts.action in get_operators():
         if opts.action == "save_to_csv":
             if not opts.fields: